@@ -1,143 +1,305 @@
 import random 
 import math
-from datetime import datetime, timedelta
-import pymysql
-import os
+import bisect
+import functools
+import time
+import numpy as np
+from datetime import datetime, timezone
 import ssl 
+try:
+    # mysqlclient speaks the MySQL protocol in C; PyMySQL is the pure-Python fallback
+    import MySQLdb as db_driver
+    DB_SSL_ARGS = {"ssl": {"ca": "/app/tidb-ca.pem"}, "ssl_mode": "VERIFY_IDENTITY"}
+except ImportError:
+    import pymysql as db_driver
+    DB_SSL_ARGS = {"ssl": {
+        "ca": "/app/tidb-ca.pem",
+        "check_hostname": True,
+        "verify_mode": ssl.CERT_REQUIRED
+    }}
+import os
+import tempfile
+import logging
+import threading
+import atexit
+from dbutils.pooled_db import PooledDB
 from dotenv import load_dotenv
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+NUM_SATELLITES = 100
+NUM_GROUND_STATIONS = 7
+
+_rng = np.random.default_rng()
+# upper bounds are exclusive, unlike random.randint
+_orbits = _rng.integers(90, 181, NUM_SATELLITES).tolist()
+_priorities = _rng.choice([1, 2, 3], NUM_SATELLITES).tolist()
+_capacities = _rng.integers(1, 11, NUM_GROUND_STATIONS).tolist()
+_gs_lons = _rng.integers(-180, 181, NUM_GROUND_STATIONS).tolist()
+_gs_lats = _rng.integers(-60, 61, NUM_GROUND_STATIONS).tolist()
+
 SATELLITES = [
-    {"id": f"SAT-{i}", "orbit_period": random.randint(90, 180), "priority": random.choice([1, 2, 3])} for i in range(1, 101)
+    {"id": f"SAT-{i}", "orbit_period": orbit, "priority": priority, "offset": i}
+    for i, (orbit, priority) in enumerate(zip(_orbits, _priorities), start=1)
 ]
 GROUND_STATIONS = [
-    {"id": f"GS-{i}", "location": f"Location-{i}", "capacity": random.randint(1, 10), "lon": random.randint(-180, 180), "lat": random.randint(-60, 60)} for i in range(1, 8)
+    {"id": f"GS-{i}", "location": f"Location-{i}", "capacity": capacity, "lon": lon, "lat": lat}
+    for i, (capacity, lon, lat) in enumerate(zip(_capacities, _gs_lons, _gs_lats), start=1)
 ]
+SAT_ORBIT = {s["id"]: s["orbit_period"] for s in SATELLITES}
+SAT_OFFSET = {s["id"]: s["offset"] for s in SATELLITES}
+EARTH_RADIUS_KM = 6371
+CONTACT_RANGE_KM = 5000
+# great-circle distance is at least R * |dlat|, so stations further apart in latitude can never be in range
+MAX_CONTACT_DLAT_DEG = math.degrees(CONTACT_RANGE_KM / EARTH_RADIUS_KM)
+
 TIDB_HOST = "basic-tidb.tidb-cluster.svc.cluster.local"
 TIDB_USER = "root"
 TIDB_PASSWORD = ""
 TIDB_DATABASE = "satellite_sim"
 
-def simulate_satellite_position(orbit_period, timestamp=None, sat_id=None):
-    if timestamp is None:
-        timestamp = datetime.utcnow()
-    offset = int(sat_id.split("-")[1]) if sat_id else 0
-    minutes = timestamp.minute + timestamp.hour * 60 + offset  # Add offset
+MINUTES_PER_DAY = 24 * 60
+
+def contact_dtype(satellites, ground_stations):
+    # fixed-width unicode fields truncate silently, so size them to the longest id
+    sat_width = max((len(s["id"]) for s in satellites), default=1)
+    gs_width = max((len(gs["id"]) for gs in ground_stations), default=1)
+    return np.dtype([
+        ("satellite_id", f"U{sat_width}"),
+        ("ground_station_id", f"U{gs_width}"),
+        ("start_epoch", np.int64),
+        ("end_epoch", np.int64),
+        ("distance", np.float32),
+        ("datavolume", np.int32),
+        ("priority", np.int8),
+        ("assigned", np.bool_),
+    ])
+
+def minute_of_day(epoch):
+    return epoch // 60 % MINUTES_PER_DAY
+
+@functools.lru_cache(maxsize=1024)
+def epoch_to_db_time(epoch):
+    # a batch shares a handful of distinct epochs, so each datetime is built once
+    return datetime.fromtimestamp(epoch, timezone.utc).replace(tzinfo=None)
+
+def position_at_minute(orbit_period, minutes):
     angle = (360 * minutes / orbit_period) % 360 
     lat = math.sin(math.radians(angle)) * 60
     lon = (angle - 180) % 360 - 180
     return lat, lon
 
-def haversine(lat1, lon1, lat2, lon2):
-    R = 6371
-    phi1, phi2 = map(math.radians, [lat1, lat2])
-    delta_phi = math.radians(lat2 - lat1)
-    delta_lambda = math.radians(lon2 - lon1)
-    a = (math.sin(delta_phi / 2) ** 2 +
-         math.cos(phi1) * math.cos(phi2) *
-         math.sin(delta_lambda / 2) ** 2)
-    return 2 * R * math.asin(math.sqrt(a))
-
-def generate_contact_windows(satellite, ground_stations, timestamp=None):
-    if timestamp is None:
-        timestamp = datetime.utcnow()
-    
-    lat, lon = simulate_satellite_position(satellite["orbit_period"], timestamp, satellite["id"])
-    contact_windows = []
-    
-    for gs in ground_stations:
-        distance = haversine(lat, lon, gs["lat"], gs["lon"])
-        print(f"  → Distance to {gs['id']} (lat={gs['lat']}, lon={gs['lon']}): {distance:.2f} km")
-
-        if distance < 5000:
-            duration = random.randint(5, 15)
-            contact_windows.append({
-                "satellite_id": satellite["id"],
-                "ground_station_id": gs["id"],
-                "start_time": timestamp.isoformat(),
-                "end_time": (timestamp + timedelta(minutes=duration)).isoformat(),
-                "timestamp": timestamp.isoformat(),
-                "distance": distance,
-                "datavolume": random.randint(100, 1000),
-                "priority": satellite["priority"]
-            })
-    
-    return contact_windows
-
-def generate_all_contact_windows(satellites, ground_stations, timestamp=None):
-    if timestamp is None:
-        timestamp = datetime.utcnow()
-
-    all_contact_windows = []
+def simulate_positions(orbit_periods, offsets, minutes_total):
+    # vectorized position_at_minute over arrays of satellites
+    m = minutes_total + offsets
+    ang = (360.0 * m / orbit_periods) % 360.0
+    lat = np.sin(np.radians(ang)) * 60.0
+    lon = (ang - 180.0) % 360.0 - 180.0
+    return lat, lon
+
+def pair_distances(sat_lat, sat_lon, gs_lat, gs_lon, gs_coslat):
+    # element-wise over aligned (satellite, GS) pairs, all in radians; great-circle distance in km
+    a = np.sin((sat_lat - gs_lat) / 2) ** 2 + np.cos(sat_lat) * gs_coslat * np.sin((sat_lon - gs_lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+def generate_all_contact_windows(satellites, ground_stations, start_epoch):
+    # one epoch for the whole batch keeps every window on the same start time
+    minutes_total = minute_of_day(start_epoch)
+
     shuffled = satellites.copy()
     random.shuffle(shuffled)  
+    if not shuffled or not ground_stations:
+        return np.empty(0, dtype=contact_dtype(satellites, ground_stations))
 
-    for satellite in shuffled:
-        contact_windows = generate_contact_windows(satellite, ground_stations, timestamp)
-        all_contact_windows.extend(contact_windows)
-
-    return all_contact_windows
-
-def log_contact_to_tidb(contact):
-    print(f"Logging contact: {contact}")
-    conn = pymysql.connect(
-    host=TIDB_HOST,
-    port=4000,
-    user=TIDB_USER,
-    password=TIDB_PASSWORD,
-    database=TIDB_DATABASE,
-    ssl={
-        "ca": "/app/tidb-ca.pem",
-        "check_hostname": True,
-        "verify_mode": ssl.CERT_REQUIRED
-    }
-)
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT INTO contact_windows (satellite_id, ground_station_id, start_time, end_time, timestamp, distance, datavolume, priority, assigned) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)",
-        (contact["satellite_id"], contact["ground_station_id"],
-         contact["start_time"], contact["end_time"], contact["timestamp"],
-         contact["distance"], contact["datavolume"], contact["priority"], contact["assigned"])
+    # stations don't move within a batch: convert them once, outside the pairwise math
+    gs_lat_deg = np.array([gs["lat"] for gs in ground_stations], dtype=np.float64)
+    gs_lat = np.radians(gs_lat_deg)
+    gs_lon = np.radians([gs["lon"] for gs in ground_stations])
+    gs_coslat = np.cos(gs_lat)
+
+    orbit_periods = np.array([s["orbit_period"] for s in shuffled], dtype=np.float64)
+    offsets = np.array([s["offset"] for s in shuffled], dtype=np.float64)
+    sat_lat_deg, sat_lon_deg = simulate_positions(orbit_periods, offsets, minutes_total)
+    sat_lat = np.radians(sat_lat_deg)
+    sat_lon = np.radians(sat_lon_deg)
+
+    # cheap latitude prune first, so the trig only runs on pairs that could be in range;
+    # nonzero walks row-major, so windows keep the shuffled satellite order
+    sat_idx, gs_idx = np.nonzero(np.abs(sat_lat_deg[:, None] - gs_lat_deg[None, :]) <= MAX_CONTACT_DLAT_DEG)
+    dist = pair_distances(sat_lat[sat_idx], sat_lon[sat_idx], gs_lat[gs_idx], gs_lon[gs_idx], gs_coslat[gs_idx])
+    in_range = dist < CONTACT_RANGE_KM
+    sat_idx, gs_idx, dist = sat_idx[in_range], gs_idx[in_range], dist[in_range]
+    n = len(sat_idx)
+    windows = np.empty(n, dtype=contact_dtype(shuffled, ground_stations))
+    windows["satellite_id"] = np.array([s["id"] for s in shuffled])[sat_idx]
+    windows["ground_station_id"] = np.array([gs["id"] for gs in ground_stations])[gs_idx]
+    windows["start_epoch"] = start_epoch
+    windows["end_epoch"] = windows["start_epoch"] + np.array([random.randint(5, 15) for _ in range(n)], dtype=np.int64) * 60
+    windows["distance"] = dist
+    windows["datavolume"] = [random.randint(100, 1000) for _ in range(n)]
+    windows["priority"] = np.array([s["priority"] for s in shuffled])[sat_idx]
+    windows["assigned"] = False
+    return windows
+
+_POOL = None
+_WRITE_POOL = None
+_POOL_LOCK = threading.Lock()
+
+def _make_pool(maxconnections, **extra):
+    return PooledDB(
+        creator=db_driver,
+        mincached=min(2, maxconnections),
+        maxcached=min(5, maxconnections),
+        maxconnections=maxconnections,
+        blocking=True,
+        # connections run in autocommit; DBUtils still rolls back anything opened with begin()
+        reset=False,
+        host=TIDB_HOST,
+        port=4000,
+        user=TIDB_USER,
+        password=TIDB_PASSWORD,
+        database=TIDB_DATABASE,
+        autocommit=True,
+        read_timeout=30,
+        **DB_SSL_ARGS,
+        **extra
     )
-    conn.commit()
-    cursor.close()
-    conn.close()
 
-def assign_contacts(contact_windows, ground_stations):
-    print("--called assign_contacts--")
-    sorted_windows = sorted(contact_windows, key=lambda x: (x["priority"], x["start_time"]))
-    assignments = []
-    gs_schedules = {gs["id"]: [] for gs in ground_stations}
-
-    for contact in sorted_windows:
-        gs_id = contact["ground_station_id"]
-        start = datetime.fromisoformat(contact["start_time"])
-        end = datetime.fromisoformat(contact["end_time"])
-
-        overlaps = sum(
-            not (end <= datetime.fromisoformat(existing["end_time"]) or
-                 start >= datetime.fromisoformat(existing["start_time"]))
-            for existing in gs_schedules[gs_id]
+def get_pool():
+    global _POOL
+    if _POOL is None:
+        with _POOL_LOCK:
+            if _POOL is None:
+                _POOL = _make_pool(10)
+    return _POOL
+
+def get_write_pool():
+    # LOAD DATA LOCAL lets the server ask for client files, so only the simulation writer enables it
+    global _WRITE_POOL
+    if _WRITE_POOL is None:
+        with _POOL_LOCK:
+            if _WRITE_POOL is None:
+                _WRITE_POOL = _make_pool(2, local_infile=True)
+    return _WRITE_POOL
+
+def get_conn():
+    # close() on the pooled wrapper hands the TLS connection back to the pool;
+    # the pool pings on checkout and reconnects if the server dropped the session
+    return get_pool().connection()
+
+def get_write_conn():
+    return get_write_pool().connection()
+
+@atexit.register
+def close_pool():
+    global _POOL, _WRITE_POOL
+    with _POOL_LOCK:
+        for pool in (_POOL, _WRITE_POOL):
+            if pool is not None:
+                pool.close()
+        _POOL = None
+        _WRITE_POOL = None
+
+CONTACT_COLUMNS = "satellite_id, ground_station_id, start_time, end_time, timestamp, distance, datavolume, priority, assigned"
+TELEMETRY_COLUMNS = "satellite_id, ground_station_id, timestamp, battery_level, temperature, position_lat, position_lon, status"
+CONTACT_INSERT_SQL = (
+    f"INSERT INTO contact_windows ({CONTACT_COLUMNS}) "
+    "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)"
+)
+TELEMETRY_INSERT_SQL = (
+    f"INSERT INTO telemetry ({TELEMETRY_COLUMNS}) "
+    "VALUES (%s, %s, %s, %s, %s, %s, %s, %s)"
+)
+
+# above this many rows a LOAD DATA stream beats even a multi-VALUES INSERT
+BULK_LOAD_THRESHOLD = 1000
+
+# LOAD DATA's default ESCAPED BY '\\' treats these as field/line structure unless escaped
+TSV_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n"})
+
+def tsv_field(value):
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    return str(value).translate(TSV_ESCAPES)
+
+def bulk_load(cursor, table, columns, rows):
+    # the drivers only stream LOCAL INFILE from a real path, so spool the rows to a temp file
+    fd, path = tempfile.mkstemp(suffix=".tsv")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            for row in rows:
+                f.write("\t".join(map(tsv_field, row)) + "\n")
+        cursor.execute(
+            f"LOAD DATA LOCAL INFILE %s INTO TABLE {table} "
+            "CHARACTER SET utf8mb4 "
+            "FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' "
+            f"({columns})",
+            (path,)
         )
-        print(f"{gs_id} overlaps: {overlaps}")
-        if overlaps < next(gs["capacity"] for gs in ground_stations if gs["id"] == gs_id):
-            gs_schedules[gs_id].append(contact)
-            contact["assigned"] = True
-            print(f"Assigned contact {contact['satellite_id']} to ground station {gs_id}")
+    finally:
+        os.remove(path)
+
+def insert_rows(cursor, table, columns, insert_sql, rows):
+    # keep insert_sql a plain INSERT ... VALUES (...): only that shape is collapsed by
+    # executemany into one multi-VALUES statement, anything else runs row by row
+    if not rows:
+        return
+    if len(rows) >= BULK_LOAD_THRESHOLD:
+        bulk_load(cursor, table, columns, rows)
+    else:
+        cursor.executemany(insert_sql, rows)
+
+def log_contacts_to_tidb(cursor, contacts):
+    # tolist() hands back native Python values, which the driver knows how to escape
+    rows = [
+        (sat_id, gs_id, epoch_to_db_time(start), epoch_to_db_time(end), epoch_to_db_time(start),
+         distance, datavolume, priority, assigned)
+        for sat_id, gs_id, start, end, distance, datavolume, priority, assigned in contacts.tolist()
+    ]
+    insert_rows(cursor, "contact_windows", CONTACT_COLUMNS, CONTACT_INSERT_SQL, rows)
+
+def assign_contacts(contact_windows, ground_stations):
+    logger.debug("--called assign_contacts--")
+    windows = contact_windows[np.lexsort((contact_windows["start_epoch"], contact_windows["priority"]))]
+    capacity = {gs["id"]: gs["capacity"] for gs in ground_stations}
+    # per-GS sorted start and end epochs of the contacts scheduled so far
+    gs_starts = {gs["id"]: [] for gs in ground_stations}
+    gs_ends = {gs["id"]: [] for gs in ground_stations}
+    assigned = np.zeros(len(windows), dtype=np.bool_)
+
+    for k, (sat_id, gs_id, start, end) in enumerate(zip(
+            windows["satellite_id"].tolist(), windows["ground_station_id"].tolist(),
+            windows["start_epoch"].tolist(), windows["end_epoch"].tolist())):
+        starts = gs_starts[gs_id]
+        ends = gs_ends[gs_id]
+
+        # scheduled intervals starting before our end, minus those already finished by our start
+        overlaps = bisect.bisect_left(starts, end) - bisect.bisect_right(ends, start)
+        logger.debug("%s overlaps: %d", gs_id, overlaps)
+        if overlaps < capacity[gs_id]:
+            bisect.insort(starts, start)
+            bisect.insort(ends, end)
+            assigned[k] = True
+            logger.debug("Assigned contact %s to ground station %s", sat_id, gs_id)
         else:
-            contact["assigned"] = False
-            print(f"Could not assign {contact['satellite_id']} to {gs_id}")
-        assignments.append(contact)
+            logger.debug("Could not assign %s to %s", sat_id, gs_id)
 
-    return assignments
+    windows["assigned"] = assigned
+    return windows
 
-def simulate_telemetry(contact, orbit_period):
-    timestamp = datetime.fromisoformat(contact["timestamp"])
-    lat, lon = simulate_satellite_position(orbit_period, timestamp, contact["satellite_id"])
+def simulate_telemetry(contact, orbit_period, offset):
+    satellite_id = str(contact["satellite_id"])
+    start_epoch = int(contact["start_epoch"])
+    # the contact's timestamp is its start, so the minute of day comes straight from start_epoch
+    minutes = minute_of_day(start_epoch) + offset
+    lat, lon = position_at_minute(orbit_period, minutes)
     return {
-        "satellite_id": contact["satellite_id"],
-        "ground_station_id": contact["ground_station_id"],
-        "timestamp": contact["timestamp"],
+        "satellite_id": satellite_id,
+        "ground_station_id": str(contact["ground_station_id"]),
+        "timestamp": epoch_to_db_time(start_epoch),
         "battery_level": round(random.uniform(20.0, 100.0), 2),
         "temperature": round(random.uniform(-40, 85), 1),
         "position_lat": round(lat, 6),
@@ -145,64 +307,49 @@ def simulate_telemetry(contact, orbit_period):
         "status": random.choice(["OK", "LOW_POWER", "ERROR", "MAINTENANCE"])
     }
 
-def log_telemetry_to_tidb(telemetry):
-    conn = pymysql.connect(
-     host=TIDB_HOST,
-    port=4000,
-    user=TIDB_USER,
-    password=TIDB_PASSWORD,
-    database=TIDB_DATABASE,
-    ssl={
-        "ca": "/app/tidb-ca.pem",
-        "check_hostname": True,
-        "verify_mode": ssl.CERT_REQUIRED
-    }
-)
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT INTO telemetry (satellite_id, ground_station_id, timestamp, battery_level, temperature, position_lat, position_lon, status) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)",
+def log_telemetry_to_tidb(cursor, telemetry_rows):
+    rows = [
         (telemetry["satellite_id"], telemetry["ground_station_id"], telemetry["timestamp"],
          telemetry["battery_level"], telemetry["temperature"],
          telemetry["position_lat"], telemetry["position_lon"], telemetry["status"])
-    )
-    conn.commit()
-    cursor.close()
-    conn.close()
+        for telemetry in telemetry_rows
+    ]
+    insert_rows(cursor, "telemetry", TELEMETRY_COLUMNS, TELEMETRY_INSERT_SQL, rows)
 
 def main():
-    timestamp = datetime.utcnow()
-    conn = pymysql.connect(
-    host=TIDB_HOST,
-    port=4000,
-    user=TIDB_USER,
-    password=TIDB_PASSWORD,
-    database=TIDB_DATABASE,
-    ssl={
-        "ca": "/app/tidb-ca.pem",
-        "check_hostname": True,
-        "verify_mode": ssl.CERT_REQUIRED
-    }
-)
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM contact_windows WHERE end_time < UTC_TIMESTAMP()")
-    conn.commit()
-    cursor.close()
-    conn.close()
+    start_epoch = int(time.time())
 
-    all_contact_windows = generate_all_contact_windows(SATELLITES, GROUND_STATIONS, timestamp)
-    print(f"Generated {len(all_contact_windows)} contact windows.")
+    all_contact_windows = generate_all_contact_windows(SATELLITES, GROUND_STATIONS, start_epoch)
+    logger.info("Generated %d contact windows.", len(all_contact_windows))
 
     assigned_contacts = assign_contacts(all_contact_windows, GROUND_STATIONS)
-    assigned = [c for c in assigned_contacts if c.get("assigned")]
-    print(f"Assigned {len(assigned)} contact windows.")
+    assigned = assigned_contacts[assigned_contacts["assigned"]]
+    logger.info("Assigned %d contact windows.", len(assigned))
 
+    telemetry_rows = []
     for contact in assigned:
-        log_contact_to_tidb(contact)
-        orbit_period = next(s["orbit_period"] for s in SATELLITES if s["id"] == contact["satellite_id"])
-        telemetry = simulate_telemetry(contact, orbit_period)
-        print(f"Simulating telemetry for {contact['satellite_id']} at {contact['timestamp']}")
-        log_telemetry_to_tidb(telemetry)
-        print(f"Assigned & logged: {contact['satellite_id']} -> {contact['ground_station_id']}")
+        sat_id = contact["satellite_id"]
+        logger.debug("Simulating telemetry for %s at %s", sat_id, contact["start_epoch"])
+        telemetry_rows.append(simulate_telemetry(contact, SAT_ORBIT[sat_id], SAT_OFFSET[sat_id]))
+
+    # expiry cleanup and both batched inserts share one pooled connection and one commit
+    conn = get_write_conn()
+    cursor = None
+    try:
+        conn.begin()
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM contact_windows WHERE end_time < UTC_TIMESTAMP()")
+        log_contacts_to_tidb(cursor, assigned)
+        log_telemetry_to_tidb(cursor, telemetry_rows)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        if cursor is not None:
+            cursor.close()
+        conn.close()
+    logger.info("Logged %d contacts and %d telemetry rows.", len(assigned), len(telemetry_rows))
 
 if __name__ == "__main__":
     main()